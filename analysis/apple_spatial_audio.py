@@ -3,7 +3,7 @@ from scipy.io import wavfile
 import soundfile as sf
 import argparse
 import os
-from scipy.signal import fftconvolve
+from scipy.fft import next_fast_len, rfft, irfft
 import wave
 import struct
 
@@ -11,6 +11,10 @@ class AppleSpatialProcessor:
     def __init__(self):
         """Initialize the spatial audio processor for Apple device compatibility"""
         self.sample_rate = None
+        self._lfe_h = None
+        self._lfe_key = None
+        self._lfe_H = None
+        self._lfe_n_fft = None
         
     def process_audio(self, input_file, output_file):
         """
@@ -24,9 +28,10 @@ class AppleSpatialProcessor:
         except Exception as e:
             try:
                 self.sample_rate, audio_data = wavfile.read(input_file)
-                # Convert to float if integer data
+                # Convert to float if integer data, casting and scaling in one pass
                 if audio_data.dtype.kind in 'iu':
-                    audio_data = audio_data.astype(np.float32) / np.iinfo(audio_data.dtype).max
+                    scale = np.float32(1.0 / np.iinfo(audio_data.dtype).max)
+                    audio_data = np.multiply(audio_data, scale, dtype=np.float32)
             except Exception as e:
                 raise RuntimeError(f"Failed to read audio file: {e}")
             
@@ -66,32 +71,46 @@ class AppleSpatialProcessor:
         
     def _extract_lfe(self, mic_data, cutoff_freq=120):
         """Extract low frequencies for LFE channel"""
-        # Simple lowpass filter
-        nyquist = self.sample_rate / 2
-        cutoff_normalized = cutoff_freq / nyquist
-        
-        # Create a simple FIR lowpass filter
-        filter_length = 101
-        h = np.sinc(2 * cutoff_normalized * (np.arange(filter_length) - (filter_length-1) / 2))
-        h *= np.hamming(filter_length)
-        h /= np.sum(h)
-        
-        # Apply to all channels and sum
-        lfe = np.zeros(len(mic_data))
-        for channel in range(mic_data.shape[1]):
-            lfe += np.convolve(mic_data[:, channel], h, mode='same')
+        # The filter only depends on sample rate and cutoff, so build it once
+        if self._lfe_h is None or self._lfe_key != (self.sample_rate, cutoff_freq):
+            # Simple lowpass filter
+            nyquist = self.sample_rate / 2
+            cutoff_normalized = cutoff_freq / nyquist
             
-        return lfe / mic_data.shape[1]
+            # Create a simple FIR lowpass filter
+            filter_length = 101
+            h = np.sinc(2 * cutoff_normalized * (np.arange(filter_length) - (filter_length-1) / 2))
+            h *= np.hamming(filter_length)
+            h /= np.sum(h)
+            
+            self._lfe_h = h
+            self._lfe_key = (self.sample_rate, cutoff_freq)
+            self._lfe_H = None
+        h = self._lfe_h
+        
+        # Filter spectrum is cached for the transform length of this input
+        num_samples = len(mic_data)
+        n_fft = next_fast_len(num_samples + len(h) - 1, real=True)
+        if self._lfe_H is None or self._lfe_n_fft != n_fft:
+            self._lfe_H = rfft(h, n=n_fft)
+            self._lfe_n_fft = n_fft
+        
+        # The filter is linear, so averaging the channels first is the same
+        # as filtering each one and needs a single forward transform
+        mix_spec = rfft(mic_data.mean(axis=1), n=n_fft, workers=-1)
+        lfe = irfft(mix_spec * self._lfe_H, n=n_fft, workers=-1)
+        
+        # Align output with mode='same'
+        offset = (len(h) - 1) // 2
+        return lfe[offset:offset + num_samples]
         
     def _save_spatial_wav(self, audio_data, output_file):
         """Save audio in a format compatible with Apple spatial audio"""
-        # Ensure audio is float32 and in range [-1, 1]
-        audio_data = np.clip(audio_data, -1.0, 1.0)
-        
-        # Convert to 24-bit PCM format (which Apple devices handle well)
-        audio_int = (audio_data * (2**23-1)).astype(np.int32)
+        # Ensure audio is in range [-1, 1]
+        np.clip(audio_data, -1.0, 1.0, out=audio_data)
         
-        # Save using soundfile with specific format
+        # Save as 24-bit PCM (which Apple devices handle well);
+        # soundfile does the quantization itself
         sf.write(
             output_file,
             audio_data,
@@ -1,12 +1,24 @@
 import numpy as np
 from scipy.io import wavfile
 import soundfile as sf
+from scipy.fft import rfft, irfft
 import argparse
 import os
-from scipy.signal import correlate, find_peaks
-import math
+import sys
 import time
 
+# Cardinal directions for each 90° bucket, starting at North
+_DIRECTIONS = np.array(["North", "East", "South", "West"])
+
+# Adjacent mic pairs (0,1), (1,2), (2,3), (3,0) for cross-correlation
+_PAIRS_U = np.array([0, 1, 2, 3])
+_PAIRS_V = np.array([1, 2, 3, 0])
+
+# Base angle of each adjacent mic pair (0°, 90°, 180°, 270° for mics 0,1,2,3)
+# and the sign of its pair angle: front-back pairs add, left-right pairs subtract
+_BASE_ANGLES = np.array([0.0, 90.0, 180.0, 270.0])
+_PAIR_SIGNS = np.array([1.0, -1.0, 1.0, -1.0])
+
 class DOADetector:
     def __init__(self):
         """Initialize the DOA detector for ReSpeaker v2.0"""
@@ -15,14 +27,21 @@ class DOADetector:
         self.sound_speed = 343.0  # Speed of sound in m/s
         self.sample_rate = None
         
-    def process_audio(self, input_file, window_size=4096, overlap=0.5):
+    def process_audio(self, input_file, window_size=4096, overlap=0.5, batch_size=256, quiet=False):
         """
         Process 6-channel audio to find direction of loudest sound
         Args:
             input_file: Path to 6-channel input audio file
             window_size: Size of processing window in samples
             overlap: Overlap between windows (0-1)
+            batch_size: Number of windows correlated per FFT batch
+            quiet: Skip printing the per-window results
+        Returns arrays of timestamps, angles, confidences and directions
+        for the windows above the energy threshold
         """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+            
         # Read audio file
         try:
             audio_data, self.sample_rate = sf.read(input_file)
@@ -36,112 +55,138 @@ class DOADetector:
             raise ValueError("Input must be 6-channel audio")
             
         # Extract microphone channels (2,3,4,5 for ReSpeaker v2.0)
-        mic_data = audio_data[:, 2:6]
+        # Transposed to (4, samples) so each channel is contiguous in memory,
+        # float32 halves the memory traffic of the batched FFTs
+        mic_data = np.ascontiguousarray(audio_data[:, 2:6].T, dtype=np.float32)
         
         # Calculate window parameters
         hop_size = int(window_size * (1 - overlap))
-        num_windows = (len(mic_data) - window_size) // hop_size + 1
         
-        # Print header
-        print("\nTime(s) | Angle° | Confidence | Direction")
-        print("-" * 45)
+        # Strided view of all windows, shape (num_windows, 4, window_size);
+        # an input shorter than one window has none
+        if mic_data.shape[1] >= window_size:
+            windows = np.lib.stride_tricks.sliding_window_view(
+                mic_data, window_size, axis=1)[:, ::hop_size].transpose(1, 0, 2)
+        else:
+            windows = np.empty((0, 4, window_size), dtype=mic_data.dtype)
         
-        # Process each window
-        for i in range(num_windows):
-            start = i * hop_size
-            end = start + window_size
-            window = mic_data[start:end]
-            
-            # Calculate timestamp for this window
-            timestamp = start / self.sample_rate
-            
-            # Calculate energy for this window
-            energy = np.sum(window ** 2)
-            
-            # Only process if energy is above threshold
-            if energy > 1e-6:  # Adjust threshold as needed
-                # Calculate DOA for this window
-                angle, confidence = self._calculate_doa(window)
-                
-                # Get cardinal direction
-                direction = self._get_direction(angle) if confidence > 0.3 else "?"
-                
-                # Print results
-                print(f"{timestamp:6.2f} | {angle:6.1f} | {confidence:9.2f} | {direction:9}")
+        # Calculate energy of all windows without copying them
+        energies = np.einsum('wcn,wcn->w', windows, windows)
+        
+        # Only process windows with energy above threshold
+        active = np.flatnonzero(energies > 1e-6)  # Adjust threshold as needed
+        
+        # Calculate DOA in fixed-size batches so the spectra and correlations
+        # stay bounded in memory for long recordings
+        angles = np.empty(len(active))
+        confidences = np.empty(len(active))
+        for start in range(0, len(active), batch_size):
+            batch = slice(start, start + batch_size)
+            angles[batch], confidences[batch] = self._calculate_doa_batch(windows[active[batch]])
+        
+        # Get cardinal directions, "?" when confidence is low
+        directions = np.where(confidences > 0.3, self._get_directions(angles), "?")
+        
+        # Calculate timestamp for each window
+        timestamps = active * hop_size / self.sample_rate
+        
+        if not quiet:
+            # Build the whole table and write it at once
+            rows = ["", "Time(s) | Angle° | Confidence | Direction", "-" * 45]
+            rows.extend(f"{t:6.2f} | {a:6.1f} | {c:9.2f} | {d:9}"
+                        for t, a, c, d in zip(timestamps, angles, confidences, directions))
+            sys.stdout.write("\n".join(rows) + "\n")
             
-            # Optional: add small delay to simulate real-time playback
-            # time.sleep(hop_size / self.sample_rate)
+        return timestamps, angles, confidences, directions
         
-    def _calculate_doa(self, window):
+    def _calculate_doa_batch(self, windows):
         """
-        Calculate direction of arrival using cross-correlation
-        Returns angle in degrees and confidence measure
+        Calculate direction of arrival for a batch of windows using GCC-PHAT
+        Args:
+            windows: Array of shape (num_windows, 4, window_size)
+        Returns arrays of angles in degrees and confidence measures
         """
-        # Mic pairs for cross-correlation
-        mic_pairs = [(0,1), (1,2), (2,3), (3,0)]  # Adjacent pairs
-        
         max_tdoa = self.radius * 2 / self.sound_speed
         max_delay = int(max_tdoa * self.sample_rate)
         
-        angles = []
-        confidences = []
+        # Zero-pad to 2N so the circular correlation equals the linear one
+        n_fft = 2 * windows.shape[-1]
+        spectra = rfft(windows, n=n_fft, axis=-1, workers=-1)
+        
+        # Cross-spectra of all adjacent pairs at once with PHAT weighting,
+        # shape (num_windows, 4, n_fft // 2 + 1)
+        cross = spectra[:, _PAIRS_U] * np.conj(spectra[:, _PAIRS_V])
+        cross /= np.abs(cross) + 1e-12
+        correlation = irfft(cross, n=n_fft, axis=-1, workers=-1)
+        
+        # Keep only the physically possible delays for the peak search;
+        # negative lags wrap around to the end of the unshifted correlation
+        lags = np.concatenate([correlation[..., n_fft - max_delay:],
+                               correlation[..., :max_delay + 1]], axis=-1)
+        norms = np.max(np.abs(correlation), axis=-1)
+        
+        return self._peaks_to_angles(lags, norms, max_delay)
+        
+    def _peaks_to_angles(self, lags, norms, max_delay):
+        """
+        Convert correlation peaks of all mic pairs into a weighted angle
+        Args:
+            lags: Correlation around zero lag, shape (num_windows, 4, 2*max_delay+1)
+            norms: Maximum absolute correlation per pair, shape (num_windows, 4)
+            max_delay: Largest possible delay in samples
+        Returns arrays of angles in degrees and confidence measures
+        """
+        # Strongest peak of every pair in every window
+        peak_idx = np.argmax(lags, axis=-1)
+        
+        # Correlation at the peak and its two neighbours
+        num_lags = lags.shape[-1]
+        neighbours = np.stack([np.maximum(peak_idx - 1, 0), peak_idx,
+                               np.minimum(peak_idx + 1, num_lags - 1)], axis=-1)
+        before, peak_height, after = np.moveaxis(
+            np.take_along_axis(lags, neighbours, axis=-1), -1, 0)
+        
+        # Parabolic interpolation of the peak for sub-sample delays,
+        # skipped when the peak sits on the edge of the search range
+        denominator = before - 2 * peak_height + after
+        interior = (peak_idx > 0) & (peak_idx < num_lags - 1) & (denominator < 0)
+        offset = np.where(interior, 0.5 * (before - after) / np.where(interior, denominator, 1), 0)
+        int_delays = peak_idx - max_delay
+        delays = int_delays + offset
+        
+        # Calculate angle between each mic pair in a single arcsin over all
+        # delays, clipped against rounding just past the maximum delay
+        scale = self.sound_speed / (2 * self.radius * self.sample_rate)
+        pair_angles = np.degrees(np.arcsin(np.clip(delays * scale, -1.0, 1.0)))
+        int_pair_angles = np.degrees(np.arcsin(np.clip(int_delays * scale, -1.0, 1.0)))
+        
+        # Normalize angles to 0-360 by the turn of the integer-delay angle, so
+        # the sub-sample refinement of a delay near zero keeps the angle next
+        # to its base instead of wrapping it to the other side of 360°
+        turns = np.floor((_BASE_ANGLES + _PAIR_SIGNS * int_pair_angles) / 360)
+        angles = _BASE_ANGLES + _PAIR_SIGNS * pair_angles - 360 * turns
+        
+        # Calculate confidence based on peak height
+        confidences = np.abs(peak_height) / np.maximum(norms, 1e-12)
         
-        for mic1, mic2 in mic_pairs:
-            # Cross-correlate the two signals
-            correlation = correlate(window[:, mic1], window[:, mic2], mode='full')
-            mid_point = len(correlation) // 2
-            
-            # Find peaks in correlation
-            peaks, properties = find_peaks(correlation, distance=max_delay)
-            if len(peaks) == 0:
-                continue
-                
-            # Get the strongest peak
-            peak_idx = peaks[np.argmax(correlation[peaks])]
-            delay = peak_idx - mid_point
-            
-            # Calculate angle from delay
-            if abs(delay) > max_delay:
-                continue
-                
-            # Calculate angle between mic pair
-            base_angle = 90 * mic1  # 0°, 90°, 180°, 270° for mics 0,1,2,3
-            pair_angle = math.degrees(math.asin((delay / self.sample_rate * self.sound_speed) / (2 * self.radius)))
-            
-            if mic1 in [0, 2]:  # Front-back pairs
-                angle = base_angle + pair_angle
-            else:  # Left-right pairs
-                angle = base_angle - pair_angle
-                
-            # Normalize angle to 0-360
-            angle = angle % 360
-            
-            # Calculate confidence based on peak height
-            peak_height = correlation[peak_idx]
-            confidence = abs(peak_height) / np.max(np.abs(correlation))
-            
-            angles.append(angle)
-            confidences.append(confidence)
-            
-        if not angles:
-            return 0, 0
-            
         # Weight angles by their confidences
-        weighted_angle = np.average(angles, weights=confidences)
-        avg_confidence = np.mean(confidences)
+        weight_sum = np.sum(confidences, axis=1)
+        weighted_angle = np.sum(angles * confidences, axis=1) / np.maximum(weight_sum, 1e-12) % 360
+        avg_confidence = np.mean(confidences, axis=1)
         
         return weighted_angle, avg_confidence
 
-    def _get_direction(self, angle):
-        """Convert angle to cardinal direction"""
-        if 45 <= angle < 135:
-            return "East"
-        elif 135 <= angle < 225:
-            return "South"
-        elif 225 <= angle < 315:
-            return "West"
-        else:
-            return "North"
+    def _get_directions(self, angles):
+        """Convert an array of angles to cardinal directions"""
+        idx = ((angles + 45) // 90).astype(np.int64) % 4
+        return _DIRECTIONS[idx]
+
+def _positive_int(value):
+    """argparse type for integers of at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 def main():
     parser = argparse.ArgumentParser(description='Calculate direction of arrival over time')
@@ -150,26 +195,33 @@ def main():
                       help='Analysis window size in samples (default: 4096)')
     parser.add_argument('--overlap', type=float, default=0.75,
                       help='Window overlap factor 0-1 (default: 0.75)')
+    parser.add_argument('--batch-size', type=_positive_int, default=256,
+                      help='Number of windows processed per FFT batch (default: 256)')
+    parser.add_argument('--quiet', action='store_true',
+                      help='Do not print the analysis results')
     
     args = parser.parse_args()
     
-    print("\nDirection of Arrival Analysis")
-    print(f"Processing file: {args.input_file}")
-    print(f"Window size: {args.window_size} samples")
-    print(f"Overlap: {args.overlap * 100}%")
-    
-    print("\nReference:")
-    print("  0° = North (front)")
-    print(" 90° = East (right)")
-    print("180° = South (back)")
-    print("270° = West (left)")
+    if not args.quiet:
+        print("\nDirection of Arrival Analysis")
+        print(f"Processing file: {args.input_file}")
+        print(f"Window size: {args.window_size} samples")
+        print(f"Overlap: {args.overlap * 100}%")
+        
+        print("\nReference:")
+        print("  0° = North (front)")
+        print(" 90° = East (right)")
+        print("180° = South (back)")
+        print("270° = West (left)")
     
     try:
         detector = DOADetector()
         detector.process_audio(
             args.input_file, 
             window_size=args.window_size,
-            overlap=args.overlap
+            overlap=args.overlap,
+            batch_size=args.batch_size,
+            quiet=args.quiet
         )
         
     except Exception as e:
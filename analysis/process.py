@@ -1,19 +1,28 @@
 import numpy as np
 from scipy.io import wavfile
-from scipy.signal import fftconvolve
+from scipy.fft import next_fast_len, rfft, irfft
 import soundfile as sf
 import argparse
 import os
 
 class SpatialAudioProcessor:
-    def __init__(self, hrtf_path=None):
+    def __init__(self, hrtf_path=None, radius=0.032):
         """
         Initialize the spatial audio processor
         Args:
             hrtf_path: Path to HRTF database (optional)
+            radius: Microphone array radius in meters (default: 32mm)
         """
         self.hrtf_db = self._load_hrtf_database(hrtf_path) if hrtf_path else None
         
+        # ReSpeaker v2.0 microphone array geometry (circular arrangement)
+        self._mic_positions = np.array([
+            [radius, 0, 0],    # Mic 0 (front)
+            [0, radius, 0],    # Mic 1 (right)
+            [-radius, 0, 0],   # Mic 2 (back)
+            [0, -radius, 0]    # Mic 3 (left)
+        ], dtype=np.float64)
+        
     def process_audio(self, input_file, output_file):
         """
         Process ReSpeaker v2.0 6-channel audio into binaural output.
@@ -35,45 +44,46 @@ class SpatialAudioProcessor:
                 # Fallback to soundfile
                 audio_data, sample_rate = sf.read(input_file)
             except Exception as e:
+                # Gather file diagnostics with a single stat call
+                try:
+                    st = os.stat(input_file)
+                    exists, size, permissions = True, st.st_size, oct(st.st_mode)[-3:]
+                except OSError:
+                    exists, size, permissions = False, 'N/A', 'N/A'
                 raise RuntimeError(f"Failed to read audio file {input_file}. Error: {e}\n"
-                                 f"File exists: {os.path.exists(input_file)}\n"
-                                 f"File size: {os.path.getsize(input_file) if os.path.exists(input_file) else 'N/A'}\n"
-                                 f"File permissions: {oct(os.stat(input_file).st_mode)[-3:] if os.path.exists(input_file) else 'N/A'}")
+                                 f"File exists: {exists}\n"
+                                 f"File size: {size}\n"
+                                 f"File permissions: {permissions}")
         
         if len(audio_data.shape) != 2 or audio_data.shape[1] != 6:
             raise ValueError("Input must be 6-channel audio")
             
-        # Extract just the microphone channels (2,3,4,5)
-        mic_data = audio_data[:, 2:6]
-            
-        # ReSpeaker v2.0 microphone array geometry (circular arrangement, radius=32mm)
-        radius = 0.032  # 32mm radius
-        mic_positions = np.array([
-            [radius * np.cos(0), radius * np.sin(0), 0],       # Mic 0 (front)
-            [radius * np.cos(np.pi/2), radius * np.sin(np.pi/2), 0],   # Mic 1 (right)
-            [radius * np.cos(np.pi), radius * np.sin(np.pi), 0],     # Mic 2 (back)
-            [radius * np.cos(3*np.pi/2), radius * np.sin(3*np.pi/2), 0] # Mic 3 (left)
-        ])
+        # Extract just the microphone channels (2,3,4,5) as float32,
+        # which is plenty for the 24-bit or narrower output
+        mic_data = audio_data[:, 2:6].astype(np.float32)
             
-        # Process each channel
-        left_out = np.zeros(len(mic_data))
-        right_out = np.zeros(len(mic_data))
+        # Calculate spatial parameters for all 4 mic channels
+        azimuths, elevations, distances = self._calculate_spatial_params(self._mic_positions)
         
-        for ch in range(4):  # Process the 4 mic channels
-            # Calculate spatial parameters for this channel
-            azimuth, elevation, distance = self._calculate_spatial_params(
-                mic_positions[ch])
-            
-            # Get HRTF filters for this position
-            hrtf_l, hrtf_r = self._get_hrtf_filters(azimuth, elevation, sample_rate)
-            
-            # Apply distance attenuation
-            attenuation = 1.0 / max(distance, 0.1)  # Prevent division by zero
-            channel_data = mic_data[:, ch] * attenuation
+        # Get HRTF filters for these positions, shape (filter_length, 4)
+        hrtf_l, hrtf_r = self._get_hrtf_filters(azimuths, elevations, sample_rate)
+        
+        # Distance attenuation
+        attenuation = (1.0 / np.maximum(distances, 0.1)).astype(np.float32)  # Prevent division by zero
             
-            # Convolve with HRTF filters
-            left_out += fftconvolve(channel_data, hrtf_l, mode='same')
-            right_out += fftconvolve(channel_data, hrtf_r, mode='same')
+        # Convolve all channels with their HRTF filters in the frequency domain
+        num_samples = len(mic_data)
+        filter_length = len(hrtf_l)
+        n_fft = next_fast_len(num_samples + filter_length - 1, real=True)
+        offset = (filter_length - 1) // 2  # Align output with mode='same'
+        
+        mic_spec = rfft(mic_data * attenuation[None, :], n=n_fft, axis=0, workers=-1)
+        hrtf_l_spec = rfft(hrtf_l, n=n_fft, axis=0, workers=-1)
+        hrtf_r_spec = rfft(hrtf_r, n=n_fft, axis=0, workers=-1)
+        
+        # Sum over channels before the inverse transform: one irfft per ear
+        left_out = irfft((mic_spec * hrtf_l_spec).sum(axis=1), n=n_fft, workers=-1)[offset:offset + num_samples]
+        right_out = irfft((mic_spec * hrtf_r_spec).sum(axis=1), n=n_fft, workers=-1)[offset:offset + num_samples]
             
         # Normalize output
         max_amplitude = max(np.max(np.abs(left_out)), np.max(np.abs(right_out)))
@@ -87,43 +97,47 @@ class SpatialAudioProcessor:
         print(f"Successfully processed {input_file}")
         print(f"Binaural output saved to {output_file}")
         
-    def _calculate_spatial_params(self, position):
-        """Calculate azimuth, elevation and distance from position"""
-        x, y, z = position
+    def _calculate_spatial_params(self, positions):
+        """Calculate azimuth, elevation and distance from (..., 3) positions"""
+        x, y, z = np.moveaxis(positions, -1, 0)
         distance = np.sqrt(x*x + y*y + z*z)
         azimuth = np.arctan2(y, x)
         elevation = np.arctan2(z, np.sqrt(x*x + y*y))
         return azimuth, elevation, distance
         
-    def _get_hrtf_filters(self, azimuth, elevation, sample_rate):
+    def _get_hrtf_filters(self, azimuths, elevations, sample_rate):
         """
-        Get HRTF filters for given position
-        Returns simplified placeholder filters if no HRTF database loaded
+        Get HRTF filters for an array of positions
+        Returns left and right filters of shape (filter_length, num_positions),
+        simplified placeholder filters if no HRTF database loaded
         """
         if self.hrtf_db is not None:
             # Look up closest HRTF filters in database
-            return self._lookup_hrtf(azimuth, elevation)
+            filters = [self._lookup_hrtf(azimuth, elevation)
+                       for azimuth, elevation in zip(azimuths, elevations)]
+            hrtf_l, hrtf_r = (np.stack(f, axis=1) for f in zip(*filters))
+            return hrtf_l, hrtf_r
         else:
             # Return simplified placeholder filters
             # In practice, you should use real HRTF measurements
             filter_length = 128
-            t = np.linspace(0, 1, filter_length)
+            n = np.arange(filter_length)[:, None]
             
             # Simple ITD and ILD simulation
-            itd = 0.001 * np.sin(azimuth)  # Max 1ms ITD
-            ild = np.cos(azimuth)
+            itd = 0.001 * np.sin(azimuths)  # Max 1ms ITD
+            ild = np.cos(azimuths)
             
-            hrtf_l = np.exp(-t) * (1 + ild)
-            hrtf_r = np.exp(-t) * (1 - ild)
+            # Time delay in samples, applied to the right ear for positive
+            # ITD and to the left ear for negative ITD
+            delay_samps = (itd * sample_rate).astype(np.int64)
+            delay_l = np.maximum(-delay_samps, 0)
+            delay_r = np.maximum(delay_samps, 0)
             
-            # Apply time delay
-            delay_samps = int(itd * sample_rate)
-            if delay_samps > 0:
-                hrtf_r = np.pad(hrtf_r, (delay_samps, 0))[:-delay_samps]
-            elif delay_samps < 0:
-                hrtf_l = np.pad(hrtf_l, (-delay_samps, 0))[:delay_samps]
+            # Exponential envelope over t in [0, 1], shifted by the delay
+            hrtf_l = np.where(n >= delay_l, np.exp(-(n - delay_l) / (filter_length - 1)), 0) * (1 + ild)
+            hrtf_r = np.where(n >= delay_r, np.exp(-(n - delay_r) / (filter_length - 1)), 0) * (1 - ild)
                 
-            return hrtf_l, hrtf_r
+            return hrtf_l.astype(np.float32), hrtf_r.astype(np.float32)
             
     def _load_hrtf_database(self, path):
         """Load HRTF database from file"""
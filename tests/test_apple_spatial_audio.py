@@ -0,0 +1,51 @@
+"""
+Tests for analysis/apple_spatial_audio.py
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'analysis'))
+
+from apple_spatial_audio import AppleSpatialProcessor
+
+
+def _lfe_reference(mic_data, h):
+    """Per-channel np.convolve(mode='same') mean, as before batching"""
+    return np.mean([np.convolve(mic_data[:, ch], h, mode='same')
+                    for ch in range(mic_data.shape[1])], axis=0)
+
+
+def test_extract_lfe_matches_convolve():
+    processor = AppleSpatialProcessor()
+    processor.sample_rate = 16000
+    mic_data = np.random.default_rng(1).standard_normal((3000, 4))
+
+    lfe = processor._extract_lfe(mic_data)
+
+    np.testing.assert_allclose(lfe, _lfe_reference(mic_data, processor._lfe_h), atol=1e-12)
+
+
+def test_extract_lfe_filter_spectrum_cache():
+    processor = AppleSpatialProcessor()
+    processor.sample_rate = 16000
+    rng = np.random.default_rng(4)
+    short, long = rng.standard_normal((1500, 4)), rng.standard_normal((5000, 4))
+
+    # Same length reuses the cached spectrum
+    processor._extract_lfe(short)
+    cached = processor._lfe_H
+    lfe = processor._extract_lfe(short)
+    assert processor._lfe_H is cached
+    np.testing.assert_allclose(lfe, _lfe_reference(short, processor._lfe_h), atol=1e-12)
+
+    # A different length gets a spectrum of its own transform length
+    lfe = processor._extract_lfe(long)
+    assert processor._lfe_H is not cached
+    np.testing.assert_allclose(lfe, _lfe_reference(long, processor._lfe_h), atol=1e-12)
+
+    # A new sample rate rebuilds the filter and its spectrum
+    processor.sample_rate = 48000
+    lfe = processor._extract_lfe(long)
+    np.testing.assert_allclose(lfe, _lfe_reference(long, processor._lfe_h), atol=1e-12)
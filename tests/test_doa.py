@@ -0,0 +1,139 @@
+"""
+Tests for analysis/doa.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'analysis'))
+
+from doa import DOADetector
+
+
+def _delayed_channels(delays, length=4096, seed=0):
+    """Return (4, length) noise where channel i is the source delayed by delays[i]"""
+    rng = np.random.default_rng(seed)
+    src = rng.standard_normal(length + 2 * max(abs(d) for d in delays) + 1)
+    offset = max(abs(d) for d in delays)
+    return np.stack([src[offset - d:offset - d + length] for d in delays])
+
+
+def _fractionally_delayed_channels(delays, length=4096, noise=0.05, seed=0):
+    """Return (4, length) noise delayed by possibly sub-sample delays plus independent per-mic noise"""
+    rng = np.random.default_rng(seed)
+    padded = length + 256
+    spectrum = np.fft.rfft(rng.standard_normal(padded))
+    freqs = np.fft.rfftfreq(padded)
+    channels = np.stack([np.fft.irfft(spectrum * np.exp(-2j * np.pi * freqs * d), n=padded)[128:128 + length]
+                         for d in delays])
+    return channels + noise * rng.standard_normal(channels.shape)
+
+
+def _integer_delay_angle(delays, sample_rate=16000):
+    """DOA from integer pair delays with equal weights, as before peak interpolation"""
+    pairs = [(0, 1), (1, 2), (2, 3), (3, 0)]
+    angles = []
+    for mic1, mic2 in pairs:
+        delay = round(delays[mic1] - delays[mic2])
+        pair_angle = np.degrees(np.arcsin(delay * 343.0 / (2 * 0.032 * sample_rate)))
+        sign = 1 if mic1 in [0, 2] else -1
+        angles.append((90 * mic1 + sign * pair_angle) % 360)
+    return np.mean(angles)
+
+
+def test_doa_lag_sign(monkeypatch):
+    detector = DOADetector()
+    detector.sample_rate = 16000
+    captured = {}
+
+    def capture(lags, norms, max_delay):
+        captured['delays'] = np.argmax(lags, axis=-1) - max_delay
+        return np.zeros(len(lags)), np.zeros(len(lags))
+
+    monkeypatch.setattr(detector, '_peaks_to_angles', capture)
+
+    # Pair (u, v) delay is d_u - d_v, as with correlate(x_u, x_v, mode='full')
+    delays = [0, 2, 0, -2]
+    detector._calculate_doa_batch(_delayed_channels(delays)[None])
+    pairs = [(0, 1), (1, 2), (2, 3), (3, 0)]
+    assert captured['delays'][0].tolist() == [delays[u] - delays[v] for u, v in pairs]
+
+
+def test_doa_angle_sign():
+    detector = DOADetector()
+    detector.sample_rate = 16000
+
+    # Only pair (0,1) has a peak, the other pairs get zero confidence
+    pair_angle = np.degrees(np.arcsin(343.0 / (2 * 0.032 * 16000)))
+    lags = np.zeros((2, 4, 5))
+    lags[0, 0] = [0.0, 0.5, 0.0, 1.0, 0.0]  # delay +1
+    lags[1, 0] = [0.0, 1.0, 0.0, 0.5, 0.0]  # delay -1
+
+    angles, _ = detector._peaks_to_angles(lags, np.ones((2, 4)), 2)
+    np.testing.assert_allclose(angles, [pair_angle, 360 - pair_angle])
+
+
+@pytest.mark.parametrize('delays', [
+    [0, 0, 0, 0],
+    [1, 0, -1, 0],
+    [0, 1, 0, -1],
+    [0.3, 0, -0.3, 0],
+    [-0.3, 0, 0.3, 0],
+])
+def test_doa_stable_with_noise(delays):
+    detector = DOADetector()
+    detector.sample_rate = 16000
+
+    # Sub-sample refinement must not flip the angle between windows
+    windows = np.stack([_fractionally_delayed_channels(delays, seed=seed) for seed in range(20)])
+    angles, _ = detector._calculate_doa_batch(windows.astype(np.float32))
+
+    assert np.std(angles) < 1.0
+    np.testing.assert_allclose(angles, _integer_delay_angle(delays), atol=2.0)
+
+
+def test_doa_stable_with_noise_from_file(tmp_path):
+    channels = np.concatenate([_fractionally_delayed_channels([0, 0, 0, 0], seed=seed)
+                               for seed in range(8)], axis=1)
+    audio = np.zeros((channels.shape[1], 6))
+    audio[:, 2:6] = 0.1 * channels.T
+    input_file = str(tmp_path / 'in.wav')
+    sf.write(input_file, audio, 16000, subtype='FLOAT')
+
+    _, angles, _, _ = DOADetector().process_audio(input_file, quiet=True)
+
+    assert len(angles) > 0
+    np.testing.assert_allclose(angles, 135.0, atol=2.0)
+
+
+def test_doa_rejects_invalid_batch_size():
+    detector = DOADetector()
+    for batch_size in (0, -4):
+        with pytest.raises(ValueError, match='batch_size'):
+            detector.process_audio('unused.wav', batch_size=batch_size)
+
+
+def test_doa_input_shorter_than_window(tmp_path, capsys):
+    input_file = str(tmp_path / 'short.wav')
+    sf.write(input_file, np.full((1000, 6), 0.1), 16000, subtype='FLOAT')
+
+    timestamps, angles, confidences, directions = DOADetector().process_audio(input_file)
+
+    assert len(timestamps) == len(angles) == len(confidences) == len(directions) == 0
+    assert "Time(s) | Angle° | Confidence | Direction" in capsys.readouterr().out
+
+
+def test_doa_float32_matches_float64():
+    detector = DOADetector()
+    detector.sample_rate = 16000
+    windows = np.stack([_fractionally_delayed_channels([0.7, -0.4, 1.2, 0], seed=seed)
+                        for seed in range(10)])
+
+    angles64, confidences64 = detector._calculate_doa_batch(windows)
+    angles32, confidences32 = detector._calculate_doa_batch(windows.astype(np.float32))
+
+    np.testing.assert_allclose(angles32, angles64, atol=0.1)
+    np.testing.assert_allclose(confidences32, confidences64, atol=1e-3)